@@ -1,8 +1,9 @@
 import os
 import logging
-from flask import Flask
+import click
+from flask import Flask, request
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager
+from flask_login import LoginManager, current_user
 from flask_wtf.csrf import CSRFProtect
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -36,29 +37,31 @@ def create_app():
     # Upload configuration
     app.config["UPLOAD_FOLDER"] = os.path.join(app.root_path, "static", "uploads")
     app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # 16MB max file size
+    app.config["IMPORT_MAX_CONTENT_LENGTH"] = 2 * 1024 * 1024 * 1024  # 2GB for bulk imports
+    
+    # Static pre-rendering of the public pages
+    app.config["FREEZE_ENABLED"] = os.environ.get("FREEZE_ENABLED") == "1"
+    app.config["FREEZE_DIR"] = os.environ.get("FREEZE_DIR", os.path.join(app.instance_path, "frozen"))
     
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
+    
+    # Bulk imports may be far larger than a regular image upload. Registered
+    # before CSRFProtect, whose before_request reads the form first.
+    @app.before_request
+    def raise_import_upload_limit():
+        if (request.endpoint == "owner.transfer"
+                and current_user.is_authenticated and current_user.is_owner):
+            request.max_content_length = app.config["IMPORT_MAX_CONTENT_LENGTH"]
+    
     csrf.init_app(app)
     
-    # CSRF configuration - disable for auth endpoints
+    # Real-time notifications (Server-Sent Events)
+    from events import broker
+    broker.init_app(app)
     
-    # Custom template filters
-    @app.template_filter('nl2br')
-    def nl2br_filter(text):
-        """Convert newlines to HTML line breaks"""
-        if text is None:
-            return ''
-        return str(text).replace('\n', '<br>\n')
-    
-    @app.template_filter('safe_nl2br')
-    def safe_nl2br_filter(text):
-        """Convert newlines to HTML line breaks and mark as safe"""
-        from markupsafe import Markup
-        if text is None:
-            return ''
-        return Markup(str(text).replace('\n', '<br>\n'))
+    # CSRF configuration - disable for auth endpoints
     
     # Login manager configuration
     login_manager.login_view = "auth.login"
@@ -95,6 +98,25 @@ def create_app():
             db.session.add(owner)
             db.session.commit()
             logging.info("Owner user created: admin/admin123")
+        
+        # Build the dashboard statistics snapshot on first run
+        from stats import get_site_stats
+        get_site_stats()
+    
+    @app.cli.command('refresh-stats')
+    def refresh_stats_command():
+        """Recompute the owner dashboard statistics snapshot"""
+        from stats import refresh_stats
+        site = refresh_stats()
+        click.echo(f"Stats refreshed: {site.total_projects} projects, "
+              f"{site.total_likes} likes, {site.total_comments} comments")
+    
+    from transfer import export_command, import_command
+    app.cli.add_command(export_command)
+    app.cli.add_command(import_command)
+    
+    from freeze import freeze_command
+    app.cli.add_command(freeze_command)
     
     # Register blueprints
     from routes import main_bp, auth_bp, owner_bp
@@ -102,6 +124,19 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(owner_bp, url_prefix="/owner")
     
+    # Serve frozen public pages to anonymous visitors
+    if app.config["FREEZE_ENABLED"]:
+        from freeze import FrozenSiteMiddleware
+        app.wsgi_app = FrozenSiteMiddleware(
+            app.wsgi_app,
+            app.config["FREEZE_DIR"],
+            (app.config["SESSION_COOKIE_NAME"], app.config.get("REMEMBER_COOKIE_NAME", "remember_token")),
+        )
+    
+    # Template filters, bytecode cache, precompilation and compression
+    import render
+    render.init_app(app)
+    
     return app
 
 # Create app instance
@@ -0,0 +1,145 @@
+"""Compare page rendering with and without the render optimizations.
+
+Seeds a throwaway SQLite database, then boots the app in a fresh process per
+variant and measures boot time, time to first byte and bytes on the wire:
+
+    python bench_render.py --projects 300 --requests 30
+
+  before      no compression, no streaming, no precompile, no bytecode cache
+  after-cold  all optimizations, empty bytecode cache (first worker to boot)
+  after-warm  all optimizations, bytecode cache filled by a previous worker
+
+Boot time includes precompiling every template; "template load" is the same
+work timed again on its own, against an empty cache for after-cold.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from jinja2 import FileSystemBytecodeCache
+
+URLS = ['/', '/projects', '/projects?page=2', '/owner/projects', '/owner/tags']
+
+VARIANTS = {
+    'before': {'COMPRESS_ENABLED': '0', 'TEMPLATE_STREAMING': '0',
+               'TEMPLATE_PRECOMPILE': '0', 'TEMPLATE_CACHE_DIR': ''},
+    'after-cold': {},
+    'after-warm': {},
+}
+
+def seed(count):
+    from app import app
+    from models import User, Tag
+    from transfer import import_content
+
+    tags = [json.dumps({'type': 'tag', 'name': f'tag-{i}', 'color': '#007bff'}) for i in range(12)]
+    projects = [json.dumps({
+        'type': 'project',
+        'title': f'Projeto de exemplo {i}',
+        'description': 'Uma descrição razoavelmente longa para o cartão do projeto. ' * 3,
+        'content': 'Conteúdo detalhado.\n' * 20,
+        'is_published': True,
+        'is_featured': i % 10 == 0,
+        'tags': [f'tag-{i % 12}', f'tag-{(i * 7) % 12}'],
+    }) for i in range(count)]
+
+    with app.app_context():
+        if Tag.query.count():
+            return
+        owner = User.query.filter_by(is_owner=True).first()
+        import_content(tags + projects, 'seed.jsonl', owner.id)
+
+def measure(requests):
+    cache_dir = os.environ.get('TEMPLATE_CACHE_DIR')
+    cold = not cache_dir or not os.path.isdir(cache_dir) or not os.listdir(cache_dir)
+
+    started = time.perf_counter()
+    from app import app
+    boot = time.perf_counter() - started
+
+    # Cost of loading every template in a worker without its own in-memory
+    # cache. Booting has already filled an empty bytecode cache, so the cold
+    # run times a separate empty one.
+    env = app.jinja_env.overlay(cache_size=0)
+    if cold and env.bytecode_cache is not None:
+        empty_cache = os.path.join(os.path.dirname(cache_dir), 'jinja_cache_cold')
+        os.makedirs(empty_cache, exist_ok=True)
+        env = app.jinja_env.overlay(cache_size=0, bytecode_cache=FileSystemBytecodeCache(empty_cache))
+    started = time.perf_counter()
+    for name in env.list_templates(filter_func=lambda name: name.endswith('.html')):
+        env.get_template(name)
+    compile_time = time.perf_counter() - started
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'admin123'})
+    headers = {'Accept-Encoding': 'gzip, br'}
+
+    results = {'boot': boot, 'compile': compile_time, 'pages': {}}
+    for url in URLS:
+        ttfb, total, size = [], [], 0
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get(url, headers=headers, buffered=False)
+            body = iter(response.response)
+            first = next(body, b'')
+            ttfb.append(time.perf_counter() - started)
+            size = len(first) + sum(len(chunk) for chunk in body)
+            total.append(time.perf_counter() - started)
+            response.close()
+        results['pages'][url] = {
+            'first_ttfb': ttfb[0],
+            'ttfb': statistics.median(ttfb),
+            'total': statistics.median(total),
+            'bytes': size,
+        }
+    return results
+
+def run_child(args, env):
+    command = [sys.executable, os.path.abspath(__file__)] + args
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.strip().splitlines()[-1]) if output.strip() else None
+
+def report(name, results):
+    print(f"\n{name}: boot {results['boot'] * 1000:.0f} ms, "
+          f"template load {results['compile'] * 1000:.1f} ms")
+    print(f"  {'page':<18}{'1st TTFB':>10}{'TTFB':>10}{'total':>10}{'bytes':>10}")
+    for url, page in results['pages'].items():
+        print(f"  {url:<18}{page['first_ttfb'] * 1000:>8.1f}ms{page['ttfb'] * 1000:>8.1f}ms"
+              f"{page['total'] * 1000:>8.1f}ms{page['bytes']:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--projects', type=int, default=300)
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--seed', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.projects)
+        return
+    if args.measure:
+        print(json.dumps(measure(args.requests)))
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ,
+                   DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                   TEMPLATE_CACHE_DIR=os.path.join(workdir, 'jinja_cache'),
+                   FREEZE_ENABLED='0')
+        # Seed without the bytecode cache so after-cold really starts empty
+        run_child(['--seed', '--projects', str(args.projects)], dict(env, TEMPLATE_CACHE_DIR=''))
+
+        for name, overrides in VARIANTS.items():
+            results = run_child(['--measure', '--requests', str(args.requests)],
+                                dict(env, **overrides))
+            report(name, results)
+
+if __name__ == '__main__':
+    main()
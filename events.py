@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from flask import current_app
+from flask_login import current_user
+from sqlalchemy import event
+from app import db
+from models import Notification
+
+class FileRelay:
+    """Fan events out to every worker process through an append-only file.
+
+    Each process appends published events to a shared file and tails it from a
+    background thread, so a notification created in one gunicorn worker reaches
+    streams held open by the others. It is a single-host stand-in for a real
+    broker (Redis pub/sub, PostgreSQL LISTEN/NOTIFY) with the same interface.
+
+    Once the file passes max_bytes it is renamed to <path>.1 and a new one is
+    started; readers finish the old file before following the new one. A
+    reader that falls more than max_bytes behind can miss events.
+    """
+
+    def __init__(self, path, callback, poll_interval=0.25, max_bytes=1024 * 1024):
+        self.path = path
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._thread = None
+
+    def start(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with open(self.path, 'ab') as relay_file:
+            offset = relay_file.tell()
+        self._thread = threading.Thread(target=self._run, args=(offset,),
+                                        name='notification-relay', daemon=True)
+        self._thread.start()
+
+    def send(self, message):
+        # A single O_APPEND write keeps lines from different workers intact
+        line = (json.dumps(message) + '\n').encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            written = os.fstat(fd)
+        finally:
+            os.close(fd)
+        if written.st_size > self.max_bytes:
+            self._rotate(written.st_ino)
+
+    def _rotate(self, inode):
+        try:
+            # Another worker may have rotated it already
+            if os.stat(self.path).st_ino == inode:
+                os.replace(self.path, f'{self.path}.1')
+        except FileNotFoundError:
+            pass
+
+    def _run(self, offset):
+        relay_file = open(self.path, 'rb')
+        relay_file.seek(offset)
+        buffer = b''
+        while True:
+            chunk = relay_file.read()
+            if not chunk:
+                try:
+                    current = os.stat(self.path)
+                except FileNotFoundError:
+                    time.sleep(self.poll_interval)
+                    continue
+                if current.st_ino != os.fstat(relay_file.fileno()).st_ino:
+                    # Rotated, and the old file is fully read: follow the new one
+                    relay_file.close()
+                    relay_file = open(self.path, 'rb')
+                    buffer = b''
+                    continue
+                if current.st_size < relay_file.tell():
+                    # Truncated by hand
+                    relay_file.seek(0)
+                    buffer = b''
+                time.sleep(self.poll_interval)
+                continue
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if not line:
+                    continue
+                try:
+                    self.callback(json.loads(line))
+                except ValueError:
+                    logging.warning("Skipping malformed notification relay line")
+
+class NotificationBroker:
+    """In-process pub/sub feeding the owner's Server-Sent Events streams"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._relay = None
+
+    def init_app(self, app):
+        app.config.setdefault('NOTIFICATION_RELAY', os.environ.get('NOTIFICATION_RELAY', 'memory'))
+        app.config.setdefault('NOTIFICATION_RELAY_PATH',
+                              os.path.join(app.instance_path, 'notifications.relay'))
+        # A stream only notices a closed tab when it next writes, so this bounds
+        # how long a gone client keeps its worker thread
+        app.config.setdefault('NOTIFICATION_KEEPALIVE', 5)
+        app.config.setdefault('NOTIFICATION_QUEUE_SIZE', 100)
+        app.config.setdefault('NOTIFICATION_RELAY_MAX_BYTES', 1024 * 1024)
+
+        if app.config['NOTIFICATION_RELAY'] == 'file' and self._relay is None:
+            self._relay = FileRelay(app.config['NOTIFICATION_RELAY_PATH'], self._dispatch,
+                                    max_bytes=app.config['NOTIFICATION_RELAY_MAX_BYTES'])
+            self._relay.start()
+
+        app.context_processor(_unread_badge)
+        app.extensions['notification_broker'] = self
+
+    def subscribe(self, user_id, maxsize=100):
+        subscription = queue.Queue(maxsize=maxsize)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_id, event_name, data):
+        message = {'user_id': user_id, 'event': event_name, 'data': data}
+        if self._relay is not None:
+            # The relay delivers back to this process as well
+            self._relay.send(message)
+        else:
+            self._dispatch(message)
+
+    def _dispatch(self, message):
+        with self._lock:
+            subscriptions = list(self._subscribers.get(message['user_id'], ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(message)
+            except queue.Full:
+                # Slow client; it catches up through Last-Event-ID on reconnect
+                pass
+
+broker = NotificationBroker()
+
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'message': notification.message,
+        'is_read': bool(notification.is_read),
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+def unread_count(user_id):
+    return Notification.query.filter_by(user_id=user_id, is_read=False).count()
+
+def _unread_badge():
+    """Initial count for the navbar badge; the dashboard stream keeps it live"""
+    if current_user.is_authenticated and current_user.is_owner:
+        return {'unread_notification_count': unread_count(current_user.id)}
+    return {}
+
+def format_sse(event_name, data, event_id=None):
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_name}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+def notification_events(user_id, last_event_id=None):
+    """Generate the SSE stream of notifications and unread counts for a user"""
+    keepalive = current_app.config['NOTIFICATION_KEEPALIVE']
+    # Subscribe before reading missed rows so nothing falls in between
+    subscription = broker.subscribe(user_id, current_app.config['NOTIFICATION_QUEUE_SIZE'])
+    try:
+        yield 'retry: 5000\n\n'
+
+        if last_event_id is not None:
+            missed = Notification.query.filter(Notification.user_id == user_id,
+                                               Notification.id > last_event_id)\
+                                       .order_by(Notification.id).all()
+            for notification in missed:
+                yield format_sse('notification', serialize_notification(notification), notification.id)
+
+        yield format_sse('unread', {'count': unread_count(user_id)})
+        # Don't hold a pooled connection while the stream sits idle
+        db.session.remove()
+
+        while True:
+            try:
+                message = subscription.get(timeout=keepalive)
+            except queue.Empty:
+                yield ': keepalive\n\n'
+                continue
+
+            if message['event'] == 'notification':
+                yield format_sse('notification', message['data'], message['data']['id'])
+                yield format_sse('unread', {'count': unread_count(user_id)})
+                db.session.remove()
+            else:
+                yield format_sse(message['event'], message['data'])
+    finally:
+        broker.unsubscribe(user_id, subscription)
+
+# Publish notifications only once their transaction has committed
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_notifications(session, flush_context):
+    pending = session.info.setdefault('pending_notifications', [])
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            pending.append((obj.user_id, serialize_notification(obj)))
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_notifications(session):
+    pending = session.info.pop('pending_notifications', None)
+    for user_id, data in pending or ():
+        broker.publish(user_id, 'notification', data)
+
+@event.listens_for(db.session, 'after_soft_rollback')
+def _discard_notifications(session, previous_transaction):
+    session.info.pop('pending_notifications', None)
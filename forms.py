@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, TextAreaField, PasswordField, BooleanField, SelectMultipleField, URLField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, Optional, URL, ValidationError
 from wtforms.widgets import CheckboxInput, ListWidget
@@ -62,5 +62,11 @@ class TagForm(FlaskForm):
     name = StringField('Nome da tag', validators=[DataRequired(), Length(min=2, max=50)])
     color = StringField('Cor (hex)', validators=[DataRequired(), Length(min=7, max=7)])
 
+class ImportForm(FlaskForm):
+    file = FileField('Arquivo de importação', validators=[
+        FileRequired(),
+        FileAllowed(['jsonl', 'tar', 'gz', 'tgz'], 'Use um arquivo .jsonl ou .tar.gz exportado!')
+    ])
+
 class CommentForm(FlaskForm):
     content = TextAreaField('Comentário', validators=[DataRequired(), Length(min=5, max=1000)])
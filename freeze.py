@@ -0,0 +1,287 @@
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from urllib.parse import quote, urlencode, urlsplit, parse_qsl
+import click
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy import and_, func
+from werkzeug.http import parse_cookie
+from werkzeug.wrappers import Response
+from werkzeug.wsgi import wrap_file
+from app import db
+from models import Project, Tag, StalePage, project_tags
+
+# Static pre-rendering ("freeze") of the public portfolio.
+#
+# Public pages are rendered as an anonymous visitor into FREEZE_DIR using the
+# layout below, so nginx or FrozenSiteMiddleware can serve them from disk:
+#   /                          -> index.html
+#   /about                     -> about/index.html
+#   /project/<id>              -> project/<id>/index.html
+#   /projects?page=N           -> projects/index.html, projects/page/N/index.html
+#   /projects?tag=T&page=N     -> projects/tag/<T>/index.html, .../page/N/index.html
+# Write paths queue StalePage keys ('project:<id>', 'listings', 'about', '*')
+# and `flask freeze --stale` re-renders just the pages those keys touch.
+
+PROJECTS_PER_PAGE = 9
+FREEZE_ENVIRON_KEY = 'portfolio.freeze'
+
+def page_path(path, args=None):
+    """Map a public URL to its file under FREEZE_DIR, or None if it can't be frozen"""
+    args = args or {}
+    if path == '/':
+        return 'index.html' if not args else None
+    if path == '/about':
+        return 'about/index.html' if not args else None
+    if path.startswith('/project/'):
+        project_id = path[len('/project/'):]
+        if project_id.isdigit() and not args:
+            return f'project/{int(project_id)}/index.html'
+        return None
+    if path != '/projects':
+        return None
+
+    # Searches always go to the app
+    if set(args) - {'page', 'tag', 'search'} or args.get('search'):
+        return None
+    page = args.get('page') or '1'
+    if not page.isdigit() or int(page) < 1:
+        return None
+    tag = args.get('tag', '')
+    if tag in ('.', '..'):
+        return None
+
+    base = f"projects/tag/{quote(tag, safe='')}" if tag else 'projects'
+    if int(page) == 1:
+        return f'{base}/index.html'
+    return f'{base}/page/{int(page)}/index.html'
+
+def listing_url(page=1, tag=None):
+    args = {}
+    if page > 1:
+        args['page'] = page
+    if tag:
+        args['tag'] = tag
+    return f'/projects?{urlencode(args)}' if args else '/projects'
+
+def _page_count(total):
+    return max(1, math.ceil(total / PROJECTS_PER_PAGE))
+
+def _listing_urls():
+    """Every paginated listing, unfiltered and per tag"""
+    published = Project.query.filter_by(is_published=True).count()
+    urls = [listing_url(page) for page in range(1, _page_count(published) + 1)]
+
+    tag_counts = db.session.query(Tag.name, func.count(Project.id))\
+                           .select_from(Tag)\
+                           .outerjoin(project_tags, project_tags.c.tag_id == Tag.id)\
+                           .outerjoin(Project, and_(Project.id == project_tags.c.project_id,
+                                                    Project.is_published.is_(True)))\
+                           .group_by(Tag.name).all()
+    for name, count in tag_counts:
+        urls.extend(listing_url(page, name) for page in range(1, _page_count(count) + 1))
+    return urls
+
+def _project_urls(project_id):
+    """Pages showing a project: its detail page, the home page and its listing pages"""
+    project = db.session.get(Project, project_id)
+    if project is None or not project.is_published:
+        _remove(current_app.config['FREEZE_DIR'], page_path(f'/project/{project_id}'))
+        return {'/'}
+
+    newer = Project.query.filter_by(is_published=True)\
+                         .filter(Project.created_at > project.created_at)
+    urls = {f'/project/{project.id}', '/',
+            listing_url(newer.count() // PROJECTS_PER_PAGE + 1)}
+    for tag in project.tags:
+        position = newer.filter(Project.tags.contains(tag)).count()
+        urls.add(listing_url(position // PROJECTS_PER_PAGE + 1, tag.name))
+    return urls
+
+def _write(root, target, data):
+    path = os.path.join(root, target)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as page_file:
+        page_file.write(data)
+    os.replace(temp_path, path)
+
+def _remove(root, target):
+    path = os.path.join(root, target)
+    if os.path.exists(path):
+        os.remove(path)
+
+def _prune(root, keep, folder=''):
+    """Delete frozen pages under folder that were not just rendered"""
+    top = os.path.join(root, folder)
+    for dirpath, dirnames, filenames in os.walk(top, topdown=False):
+        for filename in filenames:
+            target = os.path.relpath(os.path.join(dirpath, filename), root)
+            if filename.endswith('.html') and target not in keep:
+                os.remove(os.path.join(dirpath, filename))
+        if dirpath != top and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+
+def _render_chunk(urls, root):
+    if has_app_context():
+        app = current_app._get_current_object()
+    else:
+        from app import app
+    client = app.test_client(use_cookies=False)
+
+    written = []
+    for url in urls:
+        split = urlsplit(url)
+        target = page_path(split.path, dict(parse_qsl(split.query, keep_blank_values=True)))
+        response = client.get(url, environ_base={FREEZE_ENVIRON_KEY: True})
+        if response.status_code == 200:
+            _write(root, target, response.get_data())
+            written.append(target)
+        else:
+            _remove(root, target)
+        response.close()
+    return written
+
+def render_urls(urls, processes=1):
+    """Render URLs as an anonymous visitor, spread across worker processes"""
+    root = current_app.config['FREEZE_DIR']
+    urls = list(urls)
+    if processes <= 1 or len(urls) < processes * 2:
+        return _render_chunk(urls, root)
+
+    # Forked workers must not share pooled connections with this process
+    db.session.remove()
+    db.engine.dispose()
+    start_methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in start_methods else None)
+    chunks = [urls[i::processes] for i in range(processes)]
+
+    written = []
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        for targets in pool.map(_render_chunk, chunks, repeat(root)):
+            written.extend(targets)
+    return written
+
+def _clear_stale(ids, batch_size=500):
+    """Drop exactly the queue rows a run has read.
+
+    Ids are taken at insert, not at commit, so a row with a lower id than
+    the ones read may still show up later; deleting by range would lose it.
+    """
+    for start in range(0, len(ids), batch_size):
+        StalePage.query.filter(StalePage.id.in_(ids[start:start + batch_size]))\
+                       .delete(synchronize_session=False)
+    db.session.commit()
+
+def freeze_site(processes=1):
+    """Render every public page and drop the ones that no longer exist"""
+    # Everything queued so far is covered by this run
+    stale_ids = [page_id for (page_id,) in db.session.query(StalePage.id)]
+    urls = ['/', '/about'] + _listing_urls()
+    urls += [f'/project/{project_id}' for (project_id,) in
+             db.session.query(Project.id).filter_by(is_published=True).order_by(Project.id)]
+
+    written = render_urls(urls, processes)
+    _prune(current_app.config['FREEZE_DIR'], set(written))
+
+    _clear_stale(stale_ids)
+    return written
+
+def freeze_stale(processes=1):
+    """Re-render only the pages queued by mark_stale since the last run"""
+    rows = db.session.query(StalePage.id, StalePage.key).order_by(StalePage.id).all()
+    if not rows:
+        return []
+    keys = {row.key for row in rows}
+
+    if '*' in keys:
+        written = freeze_site(processes)
+    else:
+        urls = set()
+        if 'about' in keys:
+            urls.add('/about')
+        if 'listings' in keys:
+            urls.add('/')
+            urls.update(_listing_urls())
+        for key in keys:
+            if key.startswith('project:'):
+                urls.update(_project_urls(int(key.split(':', 1)[1])))
+
+        written = render_urls(sorted(urls), processes)
+        if 'listings' in keys:
+            _prune(current_app.config['FREEZE_DIR'], set(written), 'projects')
+
+    _clear_stale([row.id for row in rows])
+    return written
+
+def mark_stale(*keys):
+    """Queue frozen pages for re-rendering in the current transaction"""
+    if not current_app.config['FREEZE_ENABLED']:
+        return
+    for key in keys:
+        db.session.add(StalePage(key=key))
+
+def unfreeze_project(project_id):
+    """Stop serving a project's frozen page now, not at the next freeze run"""
+    if not current_app.config['FREEZE_ENABLED']:
+        return
+    _remove(current_app.config['FREEZE_DIR'], page_path(f'/project/{project_id}'))
+
+class FrozenSiteMiddleware:
+    """Serve frozen pages to anonymous visitors without touching Flask"""
+
+    def __init__(self, wsgi_app, root, cookie_names):
+        self.wsgi_app = wsgi_app
+        self.root = root
+        self.cookie_names = cookie_names
+
+    def __call__(self, environ, start_response):
+        path = self._frozen_file(environ)
+        if path is None:
+            return self.wsgi_app(environ, start_response)
+
+        response = Response(wrap_file(environ, open(path, 'rb')),
+                            mimetype='text/html', direct_passthrough=True)
+        stat = os.stat(path)
+        response.content_length = stat.st_size
+        response.last_modified = stat.st_mtime
+        return response(environ, start_response)
+
+    def _frozen_file(self, environ):
+        if environ.get('REQUEST_METHOD') not in ('GET', 'HEAD') or environ.get(FREEZE_ENVIRON_KEY):
+            return None
+        # Logged-in users (and anyone with flashed messages) need the live app
+        cookies = parse_cookie(environ)
+        if any(name in cookies for name in self.cookie_names):
+            return None
+
+        args = dict(parse_qsl(environ.get('QUERY_STRING', ''), keep_blank_values=True))
+        target = page_path(environ.get('PATH_INFO', ''), args)
+        if target is None:
+            return None
+        path = os.path.join(self.root, target)
+        return path if os.path.isfile(path) else None
+
+@click.command('freeze')
+@click.option('--stale', is_flag=True,
+              help='Only re-render pages queued by edits, likes and comments.')
+@click.option('--processes', default=os.cpu_count() or 1, show_default=True)
+@click.option('--interval', default=0,
+              help='With --stale, keep running and check the queue every N seconds.')
+@with_appcontext
+def freeze_command(stale, processes, interval):
+    """Pre-render the public pages to static HTML in FREEZE_DIR"""
+    while True:
+        started = time.perf_counter()
+        written = freeze_stale(processes) if stale else freeze_site(processes)
+        if written or not interval:
+            click.echo(f"Rendered {len(written)} pages to {current_app.config['FREEZE_DIR']} "
+                       f"in {time.perf_counter() - started:.2f}s")
+        if not (stale and interval):
+            break
+        db.session.remove()
+        time.sleep(interval)
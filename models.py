@@ -63,6 +63,8 @@ class Project(db.Model):
                           backref=db.backref('projects', lazy=True))
     comments = db.relationship('Comment', backref='project', lazy=True, cascade='all, delete-orphan')
     likes = db.relationship('Like', backref='project', lazy=True, cascade='all, delete-orphan')
+    stats = db.relationship('ProjectStats', backref='project', uselist=False, lazy=True,
+                            cascade='all, delete-orphan')
     
     @property
     def like_count(self):
@@ -116,3 +118,37 @@ class Notification(db.Model):
     
     def __repr__(self):
         return f'<Notification {self.id}>'
+
+class ProjectStats(db.Model):
+    """Denormalized engagement counters for a single project"""
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    like_count = db.Column(db.Integer, default=0, nullable=False)
+    comment_count = db.Column(db.Integer, default=0, nullable=False)
+    # like_count + comment_count, stored so the top projects come from an index
+    engagement = db.Column(db.Integer, default=0, nullable=False)
+    
+    __table_args__ = (db.Index('ix_project_stats_engagement', 'engagement', 'project_id'),)
+    
+    def __repr__(self):
+        return f'<ProjectStats {self.project_id}>'
+
+class SiteStats(db.Model):
+    """Single-row snapshot of the owner dashboard totals"""
+    id = db.Column(db.Integer, primary_key=True)
+    total_projects = db.Column(db.Integer, default=0, nullable=False)
+    published_projects = db.Column(db.Integer, default=0, nullable=False)
+    total_likes = db.Column(db.Integer, default=0, nullable=False)
+    total_comments = db.Column(db.Integer, default=0, nullable=False)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SiteStats {self.refreshed_at}>'
+
+class StalePage(db.Model):
+    """Queue of frozen public pages waiting to be re-rendered"""
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StalePage {self.key}>'
@@ -0,0 +1,263 @@
+import os
+import zlib
+from flask import Response, current_app, get_flashed_messages, render_template, stream_template
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/xml', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'application/xml', 'image/svg+xml',
+}
+
+def nl2br_filter(text):
+    """Convert newlines to HTML line breaks"""
+    if text is None:
+        return ''
+    return str(text).replace('\n', '<br>\n')
+
+def safe_nl2br_filter(text):
+    """Convert newlines to HTML line breaks and mark as safe"""
+    if text is None:
+        return ''
+    return Markup(str(text).replace('\n', '<br>\n'))
+
+def init_app(app):
+    """Set up template caching, filters and response compression.
+
+    Call it last in create_app so the compression middleware wraps the rest of
+    the WSGI stack and every blueprint template is known when precompiling.
+    """
+    app.config.setdefault('TEMPLATE_CACHE_DIR', os.environ.get(
+        'TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache')))
+    app.config.setdefault('TEMPLATE_PRECOMPILE', os.environ.get('TEMPLATE_PRECOMPILE', '1') == '1')
+    app.config.setdefault('TEMPLATE_STREAMING', os.environ.get('TEMPLATE_STREAMING', '1') == '1')
+    app.config.setdefault('TEMPLATE_STREAM_CHUNK_SIZE', 8 * 1024)
+    app.config.setdefault('COMPRESS_ENABLED', os.environ.get('COMPRESS_ENABLED', '1') == '1')
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+    app.config.setdefault('COMPRESS_MIMETYPES', COMPRESSIBLE_MIMETYPES)
+
+    app.add_template_filter(nl2br_filter, 'nl2br')
+    app.add_template_filter(safe_nl2br_filter, 'safe_nl2br')
+
+    # Compiled templates are shared on disk by every worker process
+    cache_dir = app.config['TEMPLATE_CACHE_DIR']
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+    if app.config['TEMPLATE_PRECOMPILE']:
+        precompile_templates(app)
+
+    if app.config['COMPRESS_ENABLED']:
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            min_size=app.config['COMPRESS_MIN_SIZE'],
+            level=app.config['COMPRESS_LEVEL'],
+            brotli_quality=app.config['COMPRESS_BROTLI_QUALITY'],
+            mimetypes=app.config['COMPRESS_MIMETYPES'],
+        )
+
+def precompile_templates(app):
+    """Load every HTML template so no request pays for compiling one"""
+    env = app.jinja_env
+    names = env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+def _rechunk(chunks, size):
+    """Group Jinja's many small stream events into larger writes"""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def render_page(template_name, **context):
+    """Render a listing page, streaming it when TEMPLATE_STREAMING is on"""
+    if not current_app.config['TEMPLATE_STREAMING']:
+        return render_template(template_name, **context)
+
+    # The session is saved before the body is sent, so anything the templates
+    # would store in it (CSRF token, consumed flashes) has to happen now.
+    if current_user.is_authenticated:
+        generate_csrf()
+    get_flashed_messages(with_categories=True)
+
+    chunks = stream_template(template_name, **context)
+    return Response(_rechunk(chunks, current_app.config['TEMPLATE_STREAM_CHUNK_SIZE']),
+                    mimetype='text/html')
+
+class _GzipCompressor:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+class CompressionMiddleware:
+    """Compress text responses with brotli or gzip, as the client prefers.
+
+    Bodies smaller than min_size are sent as they are. Streamed bodies are
+    compressed chunk by chunk and flushed after each one, so streaming keeps
+    its early first byte.
+    """
+
+    def __init__(self, wsgi_app, min_size=500, level=6, brotli_quality=4,
+                 mimetypes=COMPRESSIBLE_MIMETYPES):
+        self.wsgi_app = wsgi_app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.mimetypes = set(mimetypes)
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    def __call__(self, environ, start_response):
+        encoding = None
+        if environ.get('REQUEST_METHOD') != 'HEAD':
+            accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+            encoding = accepted.best_match(self.encodings)
+        if encoding is None:
+            return self.wsgi_app(environ, start_response)
+
+        captured = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            captured[:] = [status, headers, exc_info]
+            return self._write_not_supported
+
+        app_iter = self.wsgi_app(environ, capture_start_response)
+        return self._respond(app_iter, captured, encoding, start_response)
+
+    @staticmethod
+    def _write_not_supported(data):
+        raise RuntimeError("CompressionMiddleware does not support the WSGI write() callable")
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.level)
+
+    def _should_compress(self, status, headers):
+        if not status.startswith('200'):
+            return False
+        header_map = {name.lower(): value for name, value in headers}
+        if 'content-encoding' in header_map:
+            return False
+        mimetype = header_map.get('content-type', '').split(';')[0].strip().lower()
+        if mimetype not in self.mimetypes:
+            return False
+        length = header_map.get('content-length')
+        return length is None or int(length) >= self.min_size
+
+    def _compressed_headers(self, headers, encoding, length=None):
+        result = []
+        vary = None
+        for name, value in headers:
+            lowered = name.lower()
+            if lowered == 'content-length':
+                continue
+            if lowered == 'vary':
+                vary = value
+                continue
+            if lowered == 'etag' and not value.startswith('W/'):
+                value = 'W/' + value
+            result.append((name, value))
+        result.append(('Vary', f'{vary}, Accept-Encoding' if vary else 'Accept-Encoding'))
+        result.append(('Content-Encoding', encoding))
+        if length is not None:
+            result.append(('Content-Length', str(length)))
+        return result
+
+    def _respond(self, app_iter, captured, encoding, start_response):
+        chunks = iter(app_iter)
+        buffered = []
+        size = 0
+        exhausted = False
+        try:
+            # start_response may be deferred until the first chunk
+            while not captured and not exhausted:
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    buffered.append(chunk)
+                    size += len(chunk)
+
+            status, headers, exc_info = captured
+            compress = self._should_compress(status, headers)
+            # A body with a known length is already in memory: compress it whole.
+            # Otherwise buffer up to the threshold before deciding.
+            known_length = any(name.lower() == 'content-length' for name, _ in headers)
+
+            while compress and not exhausted and (known_length or size < self.min_size):
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                else:
+                    buffered.append(chunk)
+                    size += len(chunk)
+            if exhausted and size < self.min_size:
+                compress = False
+
+            if not compress:
+                start_response(status, headers, exc_info)
+                yield from buffered
+                if not exhausted:
+                    yield from chunks
+                return
+
+            compressor = self._compressor(encoding)
+            if exhausted:
+                body = compressor.compress(b''.join(buffered)) + compressor.finish()
+                start_response(status, self._compressed_headers(headers, encoding, len(body)), exc_info)
+                yield body
+                return
+
+            start_response(status, self._compressed_headers(headers, encoding), exc_info)
+            yield compressor.compress(b''.join(buffered)) + compressor.flush()
+            for chunk in chunks:
+                if chunk:
+                    yield compressor.compress(chunk) + compressor.flush()
+            yield compressor.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
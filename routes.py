@@ -1,13 +1,20 @@
 import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, abort, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from PIL import Image
-from sqlalchemy import or_
+from sqlalchemy import or_, func
+from sqlalchemy.orm import joinedload
 from app import db, csrf
-from models import User, Project, Tag, Comment, Like, Notification
-from forms import LoginForm, RegisterForm, ProfileForm, ProjectForm, TagForm, CommentForm
+from models import User, Project, Tag, Comment, Like, Notification, project_tags
+from forms import LoginForm, RegisterForm, ProfileForm, ProjectForm, TagForm, CommentForm, ImportForm
 from utils import save_image, create_notification
+from events import broker, notification_events, unread_count
+from transfer import ImportAborted, export_jsonl, export_tar, import_content
+from freeze import PROJECTS_PER_PAGE, mark_stale, unfreeze_project
+from render import render_page
+from stats import (get_site_stats, get_top_projects, record_comment, record_like,
+                   record_project_created, record_project_published, record_project_deleted)
 
 # Main blueprint
 main_bp = Blueprint('main', __name__)
@@ -56,12 +63,14 @@ def projects():
         if tag:
             query = query.filter(Project.tags.contains(tag))
     
-    projects = query.order_by(Project.created_at.desc())\
-                   .paginate(page=page, per_page=9, error_out=False)
+    # Load the counters with the page so the cards don't query them one by one
+    projects = query.options(joinedload(Project.stats))\
+                   .order_by(Project.created_at.desc())\
+                   .paginate(page=page, per_page=PROJECTS_PER_PAGE, error_out=False)
     
     tags = Tag.query.order_by(Tag.name).all()
     
-    return render_template('projects.html', 
+    return render_page('projects.html', 
                          projects=projects, 
                          tags=tags,
                          search=search,
@@ -75,7 +84,9 @@ def project_detail(id):
         abort(404)
     
     comments = Comment.query.filter_by(project_id=id).order_by(Comment.created_at.desc()).all()
-    comment_form = CommentForm()
+    # Building the form stores a CSRF token in the session, which would give
+    # anonymous visitors a cookie and keep them off the frozen pages
+    comment_form = CommentForm() if current_user.is_authenticated else None
     
     return render_template('project_detail.html', 
                          project=project, 
@@ -94,6 +105,8 @@ def add_comment(id):
         comment.user_id = current_user.id
         comment.project_id = project.id
         db.session.add(comment)
+        record_comment(project.id)
+        mark_stale(f'project:{project.id}')
         
         # Create notification for owner
         if not current_user.is_owner:
@@ -116,12 +129,14 @@ def toggle_like(id):
     
     if like:
         db.session.delete(like)
+        record_like(project.id, -1)
         liked = False
     else:
         like = Like()
         like.user_id = current_user.id
         like.project_id = project.id
         db.session.add(like)
+        record_like(project.id, 1)
         liked = True
         
         # Create notification for owner (if not self-like)
@@ -131,6 +146,7 @@ def toggle_like(id):
                 f"{current_user.name} curtiu o projeto '{project.title}'"
             )
     
+    mark_stale(f'project:{project.id}')
     db.session.commit()
     
     return jsonify({
@@ -212,6 +228,8 @@ def edit_profile():
             filename = save_image(form.profile_image.data, 'profiles')
             current_user.profile_image = filename
         
+        if current_user.is_owner:
+            mark_stale('about')
         db.session.commit()
         flash('Perfil atualizado com sucesso!', 'success')
         return redirect(url_for('auth.profile'))
@@ -228,30 +246,32 @@ def require_owner():
 
 @owner_bp.route('/dashboard')
 def dashboard():
-    total_projects = Project.query.count()
-    published_projects = Project.query.filter_by(is_published=True).count()
-    total_likes = Like.query.count()
-    total_comments = Comment.query.count()
-    
-    recent_projects = Project.query.order_by(Project.created_at.desc()).limit(5).all()
+    stats = get_site_stats()
+    
+    recent_projects = Project.query.options(joinedload(Project.stats))\
+                                   .order_by(Project.created_at.desc()).limit(5).all()
+    top_projects = get_top_projects(limit=5)
+    # Read before the list, so the stream replays anything newer than this page
+    last_notification_id = db.session.query(func.max(Notification.id))\
+                                     .filter_by(user_id=current_user.id).scalar() or 0
     unread_notifications = Notification.query.filter_by(user_id=current_user.id, is_read=False)\
                                             .order_by(Notification.created_at.desc()).limit(10).all()
     
     return render_template('owner/dashboard.html',
-                         total_projects=total_projects,
-                         published_projects=published_projects,
-                         total_likes=total_likes,
-                         total_comments=total_comments,
+                         stats=stats,
                          recent_projects=recent_projects,
-                         notifications=unread_notifications)
+                         top_projects=top_projects,
+                         notifications=unread_notifications,
+                         last_notification_id=last_notification_id)
 
 @owner_bp.route('/projects')
 def project_list():
     page = request.args.get('page', 1, type=int)
-    projects = Project.query.order_by(Project.created_at.desc())\
+    projects = Project.query.options(joinedload(Project.stats))\
+                          .order_by(Project.created_at.desc())\
                           .paginate(page=page, per_page=10, error_out=False)
     
-    return render_template('owner/project_list.html', projects=projects)
+    return render_page('owner/project_list.html', projects=projects)
 
 @owner_bp.route('/project/new', methods=['GET', 'POST'])
 def new_project():
@@ -277,6 +297,9 @@ def new_project():
         project.tags.extend(selected_tags)
         
         db.session.add(project)
+        record_project_created(project)
+        db.session.flush()
+        mark_stale(f'project:{project.id}', 'listings')
         db.session.commit()
         
         flash('Projeto criado com sucesso!', 'success')
@@ -290,6 +313,8 @@ def edit_project(id):
     form = ProjectForm(obj=project)
     
     if form.validate_on_submit():
+        was_published = project.is_published
+        old_tag_ids = {tag.id for tag in project.tags}
         project.title = form.title.data
         project.description = form.description.data
         project.content = form.content.data
@@ -306,8 +331,16 @@ def edit_project(id):
         project.tags.clear()
         selected_tags = Tag.query.filter(Tag.id.in_(form.tags.data)).all()
         project.tags.extend(selected_tags)
+        record_project_published(was_published, project.is_published)
+        
+        if project.is_published:
+            mark_stale(f'project:{project.id}')
+        if was_published != project.is_published or old_tag_ids != {tag.id for tag in project.tags}:
+            mark_stale('listings')
         
         db.session.commit()
+        if not project.is_published:
+            unfreeze_project(project.id)
         
         flash('Projeto atualizado com sucesso!', 'success')
         return redirect(url_for('owner.project_list'))
@@ -327,8 +360,12 @@ def delete_project(id):
         if os.path.exists(image_path):
             os.remove(image_path)
     
+    record_project_deleted(project)
+    if project.is_published:
+        mark_stale('listings')
     db.session.delete(project)
     db.session.commit()
+    unfreeze_project(id)
     
     flash('Projeto excluído com sucesso!', 'success')
     return redirect(url_for('owner.project_list'))
@@ -336,7 +373,10 @@ def delete_project(id):
 @owner_bp.route('/tags')
 def tag_list():
     tags = Tag.query.order_by(Tag.name).all()
-    return render_template('owner/tag_list.html', tags=tags)
+    # One grouped count instead of loading every tag's projects
+    project_counts = dict(db.session.query(project_tags.c.tag_id, func.count())
+                                    .group_by(project_tags.c.tag_id).all())
+    return render_page('owner/tag_list.html', tags=tags, project_counts=project_counts)
 
 @owner_bp.route('/tag/new', methods=['GET', 'POST'])
 def new_tag():
@@ -347,6 +387,7 @@ def new_tag():
         tag.name = form.name.data
         tag.color = form.color.data
         db.session.add(tag)
+        mark_stale('listings')
         db.session.commit()
         
         flash('Tag criada com sucesso!', 'success')
@@ -354,10 +395,80 @@ def new_tag():
     
     return render_template('owner/tag_form.html', form=form, title='Nova Tag')
 
+@owner_bp.route('/transfer', methods=['GET', 'POST'])
+def transfer():
+    # The upload limit for this view is raised in create_app
+    form = ImportForm()
+    
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            result = import_content(upload.stream, upload.filename, current_user.id)
+            mark_stale('*')
+            db.session.commit()
+        except ImportAborted as e:
+            message = f'Erro na importação: {e}'
+            if e.projects_created:
+                # Earlier batches are already committed and public
+                mark_stale('*')
+                db.session.commit()
+                message += (f'. {e.projects_created} projetos já tinham sido importados antes do erro; '
+                            'remova-os do arquivo antes de importar novamente.')
+            flash(message, 'danger')
+        else:
+            flash(f"Importação concluída: {result['projects_created']} projetos, "
+                  f"{result['tags_created']} tags novas e {result['images_saved']} imagens.", 'success')
+            return redirect(url_for('owner.project_list'))
+    
+    return render_template('owner/transfer.html', form=form)
+
+@owner_bp.route('/export')
+def export_content():
+    if request.args.get('format') == 'jsonl':
+        chunks, filename, mimetype = export_jsonl(), 'portfolio.jsonl', 'application/x-ndjson'
+    else:
+        chunks, filename, mimetype = export_tar(), 'portfolio.tar.gz', 'application/gzip'
+    
+    return Response(stream_with_context(chunks),
+                    mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
 @owner_bp.route('/notifications/mark-read')
 def mark_notifications_read():
     Notification.query.filter_by(user_id=current_user.id, is_read=False)\
                      .update({'is_read': True})
     db.session.commit()
+    broker.publish(current_user.id, 'unread', {'count': 0})
     
     return redirect(url_for('owner.dashboard'))
+
+@owner_bp.route('/notifications/read', methods=['POST'])
+def mark_notifications_read_api():
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        return jsonify({'error': 'ids deve ser uma lista de inteiros'}), 400
+    
+    query = Notification.query.filter_by(user_id=current_user.id, is_read=False)
+    if ids is not None:
+        query = query.filter(Notification.id.in_(ids))
+    updated = query.update({'is_read': True}, synchronize_session=False)
+    db.session.commit()
+    
+    unread = unread_count(current_user.id)
+    broker.publish(current_user.id, 'unread', {'count': unread})
+    
+    return jsonify({'updated': updated, 'unread': unread})
+
+@owner_bp.route('/notifications/stream')
+def notification_stream():
+    # Reconnects send Last-Event-ID; the first connection starts after the
+    # newest notification the dashboard was rendered with
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    if last_event_id is None:
+        last_event_id = request.args.get('after', type=int)
+    events = notification_events(current_user.id, last_event_id)
+    
+    return Response(stream_with_context(events),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
@@ -12,6 +12,7 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeSmoothScrolling();
     initializeBackToTop();
     initializeSearchFilters();
+    initializeNotificationStream();
     
     console.log('Portfolio application initialized');
 });
@@ -411,6 +412,117 @@ function submitFormAjax(form, callback) {
     });
 }
 
+/**
+ * Live owner notifications over Server-Sent Events
+ */
+function initializeNotificationStream() {
+    // Only the dashboard streams, so other owner pages don't hold a server thread
+    const panel = document.getElementById('notification-panel');
+    if (!panel || !window.EventSource) return;
+    
+    const source = new EventSource(panel.dataset.notificationStream);
+    
+    source.addEventListener('notification', function(e) {
+        prependNotification(JSON.parse(e.data));
+    });
+    
+    source.addEventListener('unread', function(e) {
+        updateUnreadCount(JSON.parse(e.data).count);
+    });
+    
+    const markReadButton = document.getElementById('notification-mark-read');
+    if (markReadButton) {
+        markReadButton.addEventListener('click', function(e) {
+            e.preventDefault();
+            markNotificationsRead();
+        });
+    }
+}
+
+/**
+ * Add a pushed notification to the top of the dashboard list
+ */
+function prependNotification(notification) {
+    const list = document.getElementById('notification-list');
+    if (!list || list.querySelector(`[data-notification-id="${notification.id}"]`)) return;
+    
+    const created = new Date(notification.created_at);
+    const pad = n => String(n).padStart(2, '0');
+    const date = `${pad(created.getDate())}/${pad(created.getMonth() + 1)}/${created.getFullYear()} às ${pad(created.getHours())}:${pad(created.getMinutes())}`;
+    
+    const item = document.createElement('div');
+    item.className = 'list-group-item px-0 border-0';
+    item.dataset.notificationId = notification.id;
+    item.innerHTML = `
+        <div class="d-flex align-items-start">
+            <i class="fas fa-bell text-primary me-2 mt-1"></i>
+            <div class="flex-grow-1">
+                <p class="mb-1 small"></p>
+                <small class="text-muted">${date}</small>
+            </div>
+        </div>
+    `;
+    item.querySelector('p').textContent = notification.message;
+    list.prepend(item);
+    
+    // Keep the panel at its original size
+    while (list.children.length > 5) {
+        list.lastElementChild.remove();
+    }
+}
+
+/**
+ * Reflect the unread count in the navbar badge and dashboard panel
+ */
+function updateUnreadCount(count) {
+    const badge = document.getElementById('notification-badge');
+    if (badge) {
+        badge.textContent = count;
+        badge.classList.toggle('d-none', count === 0);
+    }
+    
+    const list = document.getElementById('notification-list');
+    if (!list) return;
+    
+    if (count === 0) {
+        list.innerHTML = '';
+    }
+    
+    const hidden = count - list.children.length;
+    const more = document.getElementById('notification-more');
+    if (more) {
+        document.getElementById('notification-more-count').textContent = hidden;
+        more.classList.toggle('d-none', hidden <= 0);
+    }
+    
+    document.getElementById('notification-empty').classList.toggle('d-none', count > 0);
+    document.getElementById('notification-mark-read').classList.toggle('d-none', count === 0);
+}
+
+/**
+ * Mark all notifications as read without reloading the dashboard
+ */
+function markNotificationsRead() {
+    const csrfToken = document.querySelector('meta[name="csrf-token"]').content;
+    
+    fetch(document.getElementById('notification-panel').dataset.notificationRead, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrfToken
+        },
+        body: JSON.stringify({})
+    })
+    .then(response => response.json())
+    .then(data => {
+        updateUnreadCount(data.unread);
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        showToast('Erro ao marcar notificações como lidas', 'error');
+    });
+}
+
 /**
  * Lazy loading for images
  */
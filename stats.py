@@ -0,0 +1,124 @@
+from datetime import datetime
+from sqlalchemy import delete, exists, func, insert, or_, select, update
+from sqlalchemy.orm import contains_eager
+from app import db
+from models import Project, Comment, Like, ProjectStats, SiteStats
+
+SITE_STATS_ID = 1
+
+def _bump_site(**deltas):
+    """Atomically add deltas to the site-wide counters"""
+    values = {getattr(SiteStats, name): getattr(SiteStats, name) + delta
+              for name, delta in deltas.items() if delta}
+    if values:
+        SiteStats.query.filter_by(id=SITE_STATS_ID).update(values, synchronize_session=False)
+
+def _bump_project(project_id, **deltas):
+    """Atomically add deltas to a project's engagement counters"""
+    values = {getattr(ProjectStats, name): getattr(ProjectStats, name) + delta
+              for name, delta in deltas.items() if delta}
+    if values:
+        values[ProjectStats.engagement] = ProjectStats.engagement + sum(deltas.values())
+        ProjectStats.query.filter_by(project_id=project_id).update(values, synchronize_session=False)
+
+def record_project_created(project):
+    """Attach an empty counter row to a new project and update the totals"""
+    project.stats = ProjectStats(like_count=0, comment_count=0, engagement=0)
+    _bump_site(total_projects=1, published_projects=int(bool(project.is_published)))
+
+def record_projects_imported(count, published):
+    """Add a bulk-imported batch of projects to the totals"""
+    _bump_site(total_projects=count, published_projects=published)
+
+def record_project_published(was_published, is_published):
+    """Track a change in a project's publication status"""
+    _bump_site(published_projects=int(bool(is_published)) - int(bool(was_published)))
+
+def record_project_deleted(project):
+    """Remove a project and its engagement from the totals"""
+    likes = project.stats.like_count if project.stats else 0
+    comments = project.stats.comment_count if project.stats else 0
+    _bump_site(total_projects=-1,
+               published_projects=-int(bool(project.is_published)),
+               total_likes=-likes,
+               total_comments=-comments)
+
+def record_like(project_id, delta):
+    """Track a like being added (delta=1) or removed (delta=-1)"""
+    _bump_project(project_id, like_count=delta)
+    _bump_site(total_likes=delta)
+
+def record_comment(project_id, delta=1):
+    """Track a comment being added to a project"""
+    _bump_project(project_id, comment_count=delta)
+    _bump_site(total_comments=delta)
+
+def _engagement_counts():
+    """Per-project like and comment counts, computed by the database"""
+    likes = select(Like.project_id, func.count().label('total'))\
+                .group_by(Like.project_id).subquery()
+    comments = select(Comment.project_id, func.count().label('total'))\
+                   .group_by(Comment.project_id).subquery()
+    like_count = func.coalesce(likes.c.total, 0)
+    comment_count = func.coalesce(comments.c.total, 0)
+    return select(Project.id.label('project_id'),
+                  like_count.label('like_count'),
+                  comment_count.label('comment_count'),
+                  (like_count + comment_count).label('engagement'))\
+               .select_from(Project)\
+               .outerjoin(likes, likes.c.project_id == Project.id)\
+               .outerjoin(comments, comments.c.project_id == Project.id)\
+               .subquery()
+
+def refresh_stats():
+    """Recompute the whole snapshot from the source tables"""
+    # Set-based statements, so no rows are loaded into the session however
+    # many projects there are
+    table = ProjectStats.__table__
+    counts = _engagement_counts()
+    db.session.execute(update(table)
+                       .where(table.c.project_id == counts.c.project_id)
+                       .where(or_(table.c.like_count != counts.c.like_count,
+                                  table.c.comment_count != counts.c.comment_count,
+                                  table.c.engagement != counts.c.engagement))
+                       .values(like_count=counts.c.like_count,
+                               comment_count=counts.c.comment_count,
+                               engagement=counts.c.engagement))
+    columns = ['project_id', 'like_count', 'comment_count', 'engagement']
+    missing = select(*(counts.c[name] for name in columns))\
+                  .where(~exists().where(table.c.project_id == counts.c.project_id))
+    db.session.execute(insert(table).from_select(columns, missing))
+    db.session.execute(delete(table).where(table.c.project_id.not_in(select(Project.id))))
+
+    total_projects, total_likes, total_comments = db.session.execute(
+        select(func.count(),
+               func.coalesce(func.sum(table.c.like_count), 0),
+               func.coalesce(func.sum(table.c.comment_count), 0))).one()
+
+    site = db.session.get(SiteStats, SITE_STATS_ID)
+    if site is None:
+        site = SiteStats(id=SITE_STATS_ID)
+        db.session.add(site)
+    site.total_projects = total_projects
+    site.published_projects = Project.query.filter_by(is_published=True).count()
+    site.total_likes = total_likes
+    site.total_comments = total_comments
+    site.refreshed_at = datetime.utcnow()
+
+    db.session.commit()
+    return site
+
+def get_site_stats():
+    """Return the totals snapshot, building it on first use"""
+    site = db.session.get(SiteStats, SITE_STATS_ID)
+    if site is None:
+        site = refresh_stats()
+    return site
+
+def get_top_projects(limit=5):
+    """Projects with the most likes and comments, with their counters loaded"""
+    # Walks ix_project_stats_engagement backwards instead of sorting every project
+    return Project.query.join(Project.stats)\
+                        .options(contains_eager(Project.stats))\
+                        .order_by(ProjectStats.engagement.desc(), ProjectStats.project_id.desc())\
+                        .limit(limit).all()
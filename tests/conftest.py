@@ -0,0 +1,48 @@
+import os
+import re
+import tempfile
+import pytest
+
+# app.py builds the application at import time, so point it at a scratch
+# database before anything imports it
+_workdir = tempfile.mkdtemp(prefix='portfolio-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ['TEMPLATE_CACHE_DIR'] = ''
+
+from app import app as flask_app, db
+from models import Project, User
+from stats import record_project_created
+
+@pytest.fixture
+def app():
+    return flask_app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def owner_client(app):
+    client = app.test_client()
+    client.post('/auth/login', data={'username': 'admin', 'password': 'admin123',
+                                     'csrf_token': csrf_token(client, '/auth/login')})
+    yield client
+    client.get('/auth/logout')
+
+@pytest.fixture
+def published_project(app):
+    with app.app_context():
+        owner = User.query.filter_by(is_owner=True).first()
+        project = Project(title='Projeto público', description='Uma descrição qualquer',
+                          is_published=True, user_id=owner.id)
+        db.session.add(project)
+        record_project_created(project)
+        db.session.commit()
+        project_id = project.id
+        db.session.remove()
+    return project_id
+
+def csrf_token(client, url):
+    """Read the CSRF token from the form rendered at url"""
+    html = client.get(url).get_data(as_text=True)
+    return re.search(r'name="csrf_token"[^>]*value="([^"]+)"', html).group(1)
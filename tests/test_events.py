@@ -0,0 +1,67 @@
+import html
+import os
+import re
+import threading
+from app import db
+from events import FileRelay
+from models import Notification, User
+
+def _add_notification(app, message):
+    with app.app_context():
+        owner = User.query.filter_by(is_owner=True).first()
+        notification = Notification(user_id=owner.id, message=message)
+        db.session.add(notification)
+        db.session.commit()
+        notification_id = notification.id
+        db.session.remove()
+    return notification_id
+
+def test_stream_replays_notifications_newer_than_the_dashboard(app, owner_client):
+    page = owner_client.get('/owner/dashboard').get_data(as_text=True)
+    stream_url = html.unescape(re.search(r'data-notification-stream="([^"]+)"', page).group(1))
+    notification_id = _add_notification(app, 'Criada entre a pagina e o stream')
+
+    response = owner_client.get(stream_url, buffered=False)
+    body = ''
+    for chunk in response.response:
+        body += chunk.decode('utf-8') if isinstance(chunk, bytes) else chunk
+        if 'event: unread' in body:
+            break
+    response.close()
+
+    assert f'id: {notification_id}\nevent: notification' in body
+    assert 'Criada entre a pagina e o stream' in body
+
+def test_owner_pages_render_the_unread_badge(app, owner_client):
+    owner_client.get('/owner/notifications/mark-read')
+    _add_notification(app, 'Nova curtida')
+
+    page = owner_client.get('/owner/tags').get_data(as_text=True)
+    badge = re.search(r'<span class="([^"]*)" id="notification-badge">(\d+)</span>', page)
+
+    assert badge.group(2) == '1'
+    assert 'd-none' not in badge.group(1)
+
+def test_file_relay_rotates_without_losing_events(tmp_path):
+    path = str(tmp_path / 'relay')
+    received = []
+    caught_up = threading.Event()
+
+    def collect(message):
+        received.append(message['data'])
+        if message['data'] % 10 == 9:
+            caught_up.set()
+
+    reader = FileRelay(path, collect, poll_interval=0.01, max_bytes=1024)
+    reader.start()
+    writer = FileRelay(path, None, max_bytes=1024)
+    # Batches of ten lines (~550 bytes), so each rotation is read before the next
+    for batch in range(20):
+        caught_up.clear()
+        for number in range(batch * 10, batch * 10 + 10):
+            writer.send({'user_id': 1, 'event': 'unread', 'data': number})
+        assert caught_up.wait(5)
+
+    assert received == list(range(200))
+    assert os.path.exists(path + '.1')
+    assert (tmp_path / 'relay').stat().st_size <= 1024 + 100
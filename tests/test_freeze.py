@@ -0,0 +1,67 @@
+import os
+import pytest
+import freeze
+from app import db
+from freeze import page_path
+from models import StalePage
+from conftest import csrf_token
+
+@pytest.fixture
+def frozen_page(app, published_project, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'FREEZE_ENABLED', True)
+    monkeypatch.setitem(app.config, 'FREEZE_DIR', str(tmp_path))
+    path = tmp_path / page_path(f'/project/{published_project}')
+    path.parent.mkdir(parents=True)
+    path.write_text('<html>frozen</html>')
+    return path
+
+def test_anonymous_public_pages_set_no_cookie(client, published_project):
+    for url in ['/', '/about', '/projects', '/projects?page=2', f'/project/{published_project}']:
+        response = client.get(url)
+        assert response.status_code == 200, url
+        response.get_data()
+        assert 'Set-Cookie' not in response.headers, url
+        response.close()
+
+def test_unpublishing_removes_the_frozen_page(owner_client, published_project, frozen_page):
+    url = f'/owner/project/{published_project}/edit'
+    response = owner_client.post(url, data={
+        'csrf_token': csrf_token(owner_client, url),
+        'title': 'Projeto público',
+        'description': 'Uma descrição qualquer',
+    })
+    assert response.status_code == 302
+    assert not os.path.exists(frozen_page)
+
+def test_deleting_removes_the_frozen_page(owner_client, published_project, frozen_page):
+    response = owner_client.post(f'/owner/project/{published_project}/delete', data={
+        'csrf_token': csrf_token(owner_client, '/owner/projects'),
+    })
+    assert response.status_code == 302
+    assert not os.path.exists(frozen_page)
+
+def test_freeze_stale_keeps_rows_committed_during_the_run(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'FREEZE_DIR', str(tmp_path))
+    rendered = []
+
+    def render_urls(urls, processes=1):
+        # A slower transaction took a lower id and commits mid-run
+        db.session.add(StalePage(id=500, key='about'))
+        db.session.commit()
+        rendered.extend(urls)
+        return []
+
+    monkeypatch.setattr(freeze, 'render_urls', render_urls)
+    with app.app_context():
+        StalePage.query.delete()
+        db.session.add(StalePage(id=1000, key='about'))
+        db.session.commit()
+
+        freeze.freeze_stale()
+        remaining = [page.id for page in StalePage.query]
+        StalePage.query.delete()
+        db.session.commit()
+        db.session.remove()
+
+    assert rendered == ['/about']
+    assert remaining == [500]
@@ -0,0 +1,99 @@
+import gzip
+import re
+import zlib
+import brotli
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from render import CompressionMiddleware
+
+PAGE = '<p>Projeto de exemplo com bastante texto repetido.</p>\n' * 100
+
+def _middleware(body, mimetype='text/html', headers=None):
+    app = Response(body, mimetype=mimetype, headers=headers)
+    return Client(CompressionMiddleware(app, min_size=500))
+
+def test_small_bodies_are_sent_uncompressed():
+    response = _middleware('<p>ok</p>').get('/', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == b'<p>ok</p>'
+
+def test_large_bodies_are_compressed_with_length_and_vary():
+    client = _middleware(PAGE, headers={'ETag': '"v1"', 'Vary': 'Cookie'})
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    body = response.get_data()
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert int(response.headers['Content-Length']) == len(body) < len(PAGE)
+    assert response.headers['Vary'] == 'Cookie, Accept-Encoding'
+    assert response.headers['ETag'] == 'W/"v1"'
+    assert gzip.decompress(body).decode('utf-8') == PAGE
+
+def test_clients_preferring_brotli_get_brotli():
+    response = _middleware(PAGE).get('/', headers={'Accept-Encoding': 'gzip;q=0.5, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.get_data()).decode('utf-8') == PAGE
+
+def test_streamed_bodies_are_flushed_chunk_by_chunk():
+    produced = []
+
+    def chunks():
+        for number in range(3):
+            produced.append(number)
+            yield PAGE
+
+    client = _middleware(chunks())
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'}, buffered=False)
+    body = iter(response.response)
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    first = decompressor.decompress(next(body))
+    assert produced == [0]
+    assert first.decode('utf-8') == PAGE
+    assert 'Content-Length' not in response.headers
+
+    rest = b''.join(decompressor.decompress(chunk) for chunk in body) + decompressor.flush()
+    response.close()
+    assert rest.decode('utf-8') == PAGE * 2
+
+def test_event_streams_and_encoded_bodies_pass_through():
+    events = _middleware('data: {}\n\n' * 100, mimetype='text/event-stream')
+    response = events.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data().startswith(b'data: {}')
+
+    encoded = _middleware(gzip.compress(PAGE.encode('utf-8')),
+                          headers={'Content-Encoding': 'gzip'})
+    response = encoded.get('/', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.get_data()).decode('utf-8') == PAGE
+
+def test_streamed_listing_decompresses_to_the_same_html(client, published_project):
+    plain = client.get('/projects')
+    compressed = client.get('/projects', headers={'Accept-Encoding': 'gzip'})
+
+    assert plain.is_streamed and 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    plain.close()
+    compressed.close()
+
+def test_render_page_saves_flashes_and_csrf_token_before_streaming(owner_client):
+    with owner_client.session_transaction() as session:
+        session.pop('csrf_token', None)
+        session['_flashes'] = [('success', 'Mensagem de teste')]
+
+    response = owner_client.get('/owner/projects')
+    assert response.is_streamed
+    page = response.get_data(as_text=True)
+    response.close()
+
+    assert 'Mensagem de teste' in page
+    with owner_client.session_transaction() as session:
+        assert '_flashes' not in session
+        assert 'csrf_token' in session
+
+    # The token in the streamed page matches the one saved in the session
+    token = re.search(r'<meta name="csrf-token" content="([^"]+)"', page).group(1)
+    saved = owner_client.post('/owner/notifications/read', json={},
+                              headers={'X-CSRFToken': token})
+    assert saved.status_code == 200
@@ -0,0 +1,80 @@
+from app import db
+from models import Comment, Like, Project, ProjectStats, SiteStats
+from stats import SITE_STATS_ID, refresh_stats
+from conftest import csrf_token
+
+def _counters(app, project_id):
+    """(like_count, comment_count, engagement) and the site totals"""
+    with app.app_context():
+        stats = db.session.get(ProjectStats, project_id)
+        site = db.session.get(SiteStats, SITE_STATS_ID)
+        result = ((stats.like_count, stats.comment_count, stats.engagement) if stats else None,
+                  {'projects': site.total_projects, 'published': site.published_projects,
+                   'likes': site.total_likes, 'comments': site.total_comments})
+        db.session.remove()
+    return result
+
+def _comment(client, project_id):
+    return client.post(f'/project/{project_id}/comment', data={
+        'csrf_token': csrf_token(client, f'/project/{project_id}'),
+        'content': 'Ótimo projeto!',
+    })
+
+def test_like_unlike_and_comment_update_counters(app, owner_client, published_project):
+    _, before = _counters(app, published_project)
+
+    assert owner_client.post(f'/project/{published_project}/like').get_json()['liked']
+    project, site = _counters(app, published_project)
+    assert project == (1, 0, 1)
+    assert site['likes'] == before['likes'] + 1
+
+    assert not owner_client.post(f'/project/{published_project}/like').get_json()['liked']
+    project, site = _counters(app, published_project)
+    assert project == (0, 0, 0)
+    assert site['likes'] == before['likes']
+
+    assert _comment(owner_client, published_project).status_code == 302
+    project, site = _counters(app, published_project)
+    assert project == (0, 1, 1)
+    assert site['comments'] == before['comments'] + 1
+
+def test_deleting_a_project_subtracts_its_engagement(app, owner_client, published_project):
+    owner_client.post(f'/project/{published_project}/like')
+    _comment(owner_client, published_project)
+    _, before = _counters(app, published_project)
+
+    response = owner_client.post(f'/owner/project/{published_project}/delete', data={
+        'csrf_token': csrf_token(owner_client, '/owner/projects'),
+    })
+
+    assert response.status_code == 302
+    project, site = _counters(app, published_project)
+    assert project is None
+    assert site == {'projects': before['projects'] - 1, 'published': before['published'] - 1,
+                    'likes': before['likes'] - 1, 'comments': before['comments'] - 1}
+
+def test_refresh_stats_repairs_drifted_and_missing_counters(app, owner_client, published_project):
+    owner_client.post(f'/project/{published_project}/like')
+    _comment(owner_client, published_project)
+
+    with app.app_context():
+        db.session.execute(db.update(ProjectStats).values(like_count=7, engagement=0))
+        db.session.execute(db.delete(ProjectStats).where(ProjectStats.project_id == published_project))
+        db.session.execute(db.update(SiteStats).values(total_likes=99, total_comments=-3))
+        db.session.commit()
+
+        site = refresh_stats()
+        expected = {'projects': Project.query.count(),
+                    'published': Project.query.filter_by(is_published=True).count(),
+                    'likes': Like.query.count(),
+                    'comments': Comment.query.count()}
+        drifted = [stats.project_id for stats in ProjectStats.query
+                   if stats.like_count != Like.query.filter_by(project_id=stats.project_id).count()
+                   or stats.engagement != stats.like_count + stats.comment_count]
+        assert site.refreshed_at is not None
+        db.session.remove()
+
+    project, totals = _counters(app, published_project)
+    assert project == (1, 1, 2)
+    assert totals == expected
+    assert drifted == []
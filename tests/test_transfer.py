@@ -0,0 +1,102 @@
+import io
+import json
+import tarfile
+import pytest
+from PIL import Image
+from app import db
+from models import Project, Tag, User
+from transfer import ImportAborted, import_content
+from conftest import csrf_token
+
+def _jsonl(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+
+def test_web_import_accepts_uploads_over_the_default_limit(app, owner_client):
+    content = 'x' * (app.config['MAX_CONTENT_LENGTH'] + 1024 * 1024)
+    data = _jsonl({'type': 'project', 'title': 'Projeto grande', 'description': 'd',
+                   'content': content})
+    assert len(data) > app.config['MAX_CONTENT_LENGTH']
+
+    response = owner_client.post('/owner/transfer', data={
+        'csrf_token': csrf_token(owner_client, '/owner/transfer'),
+        'file': (io.BytesIO(data), 'grande.jsonl'),
+    })
+
+    assert response.status_code == 302
+    with app.app_context():
+        assert Project.query.filter_by(title='Projeto grande').count() == 1
+
+def test_large_uploads_elsewhere_keep_the_default_limit(app, client):
+    data = b'x' * (app.config['MAX_CONTENT_LENGTH'] + 1)
+    response = client.post('/owner/transfer', data={'file': (io.BytesIO(data), 'a.jsonl')})
+    assert response.status_code == 413
+
+def test_failed_import_reports_projects_already_committed(app):
+    data = _jsonl({'type': 'project', 'title': 'Lote 1', 'description': 'd'},
+                  {'type': 'project', 'title': 'Lote 2', 'description': 'd',
+                   'created_at': 'ontem'})
+    with app.app_context():
+        owner = User.query.filter_by(is_owner=True).first()
+        with pytest.raises(ImportAborted) as error:
+            import_content(data.splitlines(), 'lotes.jsonl', owner.id, batch_size=1)
+
+        assert error.value.projects_created == 1
+        assert Project.query.filter_by(title='Lote 1').count() == 1
+        assert Project.query.filter_by(title='Lote 2').count() == 0
+        db.session.remove()
+
+def _import(app, data, filename='dados.jsonl', **kwargs):
+    with app.app_context():
+        owner = User.query.filter_by(is_owner=True).first()
+        try:
+            return import_content(data.splitlines(), filename, owner.id, **kwargs)
+        finally:
+            db.session.remove()
+
+def test_import_rejects_tags_that_are_not_a_list_of_names(app):
+    for tags in ['python', [''], ['web', 3]]:
+        data = _jsonl({'type': 'project', 'title': 'Tags erradas', 'description': 'd',
+                       'tags': tags})
+        with pytest.raises(ImportAborted):
+            _import(app, data)
+
+    with app.app_context():
+        assert Tag.query.filter(Tag.name.in_(['p', 'y', ''])).count() == 0
+        assert Project.query.filter_by(title='Tags erradas').count() == 0
+
+def test_import_strips_project_tag_names(app):
+    data = _jsonl({'type': 'tag', 'name': ' web '},
+                  {'type': 'project', 'title': 'Tags com espaços', 'description': 'd',
+                   'tags': [' web ', 'web']})
+    _import(app, data)
+
+    with app.app_context():
+        assert Tag.query.filter(Tag.name.like('%web%')).count() == 1
+        project = Project.query.filter_by(title='Tags com espaços').one()
+        assert [tag.name for tag in project.tags] == ['web']
+
+def test_import_reuses_an_image_shared_by_several_projects(app, tmp_path, monkeypatch):
+    monkeypatch.setitem(app.config, 'UPLOAD_FOLDER', str(tmp_path))
+    image = io.BytesIO()
+    Image.new('RGB', (4, 4), 'red').save(image, 'PNG')
+    records = _jsonl(*({'type': 'project', 'title': f'Imagem {n}', 'description': 'd',
+                        'image': 'capa.png'} for n in range(3)))
+
+    archive_data = io.BytesIO()
+    with tarfile.open(fileobj=archive_data, mode='w:gz') as archive:
+        for name, data in [('images/capa.png', image.getvalue()), ('records-00001.jsonl', records)]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    archive_data.seek(0)
+
+    with app.app_context():
+        owner = User.query.filter_by(is_owner=True).first()
+        result = import_content(archive_data, 'capa.tar.gz', owner.id, batch_size=2)
+        filenames = {project.image_filename for project in
+                     Project.query.filter(Project.title.like('Imagem %'))}
+        db.session.remove()
+
+    assert result['images_saved'] == 1
+    assert len(filenames) == 1 and None not in filenames
+    assert (tmp_path / 'projects' / filenames.pop()).exists()
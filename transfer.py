@@ -0,0 +1,370 @@
+import io
+import json
+import os
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
+from werkzeug.datastructures import FileStorage
+from app import db
+from models import User, Project, Tag, ProjectStats, project_tags
+from stats import record_projects_imported
+from freeze import mark_stale
+from utils import save_image
+
+# Bulk export/import of portfolio content.
+#
+# Content travels as JSONL records, one object per line:
+#   {"type": "tag", "name": "...", "color": "#007bff"}
+#   {"type": "project", "title": "...", "description": "...", "tags": ["..."],
+#    "image": "file.jpg", ...}
+# The tar format adds project images under images/ and splits the records into
+# records-NNNNN.jsonl members, each preceded by the images it references, so
+# both sides can work one batch at a time.
+
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_TAG_COLOR = '#007bff'
+
+PROJECT_FIELDS = ('title', 'description', 'content', 'demo_url', 'github_url',
+                  'is_published', 'is_featured')
+
+def _tag_record(tag):
+    return {'type': 'tag', 'name': tag.name, 'color': tag.color}
+
+def _project_record(project):
+    record = {'type': 'project'}
+    for field in PROJECT_FIELDS:
+        record[field] = getattr(project, field)
+    record['created_at'] = project.created_at.isoformat() if project.created_at else None
+    record['updated_at'] = project.updated_at.isoformat() if project.updated_at else None
+    record['image'] = project.image_filename
+    record['tags'] = [tag.name for tag in project.tags]
+    return record
+
+def _dump(record):
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+def _iter_tags(batch_size):
+    yield from Tag.query.order_by(Tag.id).yield_per(batch_size)
+
+def _iter_project_batches(batch_size):
+    """Walk projects by primary key so only one batch is in memory at a time"""
+    last_id = 0
+    while True:
+        batch = Project.query.options(selectinload(Project.tags))\
+                             .filter(Project.id > last_id)\
+                             .order_by(Project.id).limit(batch_size).all()
+        if not batch:
+            return
+        last_id = batch[-1].id
+        yield batch
+        for project in batch:
+            db.session.expunge(project)
+
+def export_jsonl(batch_size=DEFAULT_BATCH_SIZE):
+    """Stream every tag and project as JSONL lines (without images)"""
+    for tag in _iter_tags(batch_size):
+        yield _dump(_tag_record(tag)).encode('utf-8')
+    for batch in _iter_project_batches(batch_size):
+        yield ''.join(_dump(_project_record(project)) for project in batch).encode('utf-8')
+
+class _ChunkWriter:
+    """Write-only file object that hands tarfile output back to a generator"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _add_member(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    archive.addfile(info, io.BytesIO(data))
+
+def export_tar(batch_size=DEFAULT_BATCH_SIZE):
+    """Stream a gzipped tar with the JSONL records and project images"""
+    image_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'projects')
+    writer = _ChunkWriter()
+    with tarfile.open(fileobj=writer, mode='w|gz') as archive:
+        tags = ''.join(_dump(_tag_record(tag)) for tag in _iter_tags(batch_size))
+        _add_member(archive, 'tags.jsonl', tags.encode('utf-8'))
+        yield writer.drain()
+
+        for number, batch in enumerate(_iter_project_batches(batch_size), start=1):
+            for project in batch:
+                if not project.image_filename:
+                    continue
+                image_path = os.path.join(image_folder, project.image_filename)
+                if os.path.exists(image_path):
+                    archive.add(image_path, arcname=f'images/{project.image_filename}')
+                    yield writer.drain()
+
+            records = ''.join(_dump(_project_record(project)) for project in batch)
+            _add_member(archive, f'records-{number:05d}.jsonl', records.encode('utf-8'))
+            yield writer.drain()
+    yield writer.drain()
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+def _read_records(lines, source):
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ValueError(f"{source}, linha {number}: JSON inválido")
+        if not isinstance(record, dict) or record.get('type') not in ('tag', 'project'):
+            raise ValueError(f"{source}, linha {number}: registro sem 'type' válido")
+        yield record
+
+class Importer:
+    """Batch-insert tags and projects, resizing images in a thread pool"""
+
+    def __init__(self, user_id, batch_size=DEFAULT_BATCH_SIZE, workers=4, images_dir=None):
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.images_dir = images_dir
+        self.app = current_app._get_current_object()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        self.tag_ids = {}
+        self.pending_tags = {}
+        self.pending_projects = []
+        self.images = {}
+        self.saved_images = {}
+
+        self.tags_created = 0
+        self.tags_updated = 0
+        self.projects_created = 0
+        self.images_saved = 0
+
+    def _save_image(self, name, data):
+        with self.app.app_context():
+            return save_image(FileStorage(stream=io.BytesIO(data), filename=name), 'projects')
+
+    def _load_image(self, name):
+        path = os.path.join(self.images_dir, os.path.basename(name))
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as image_file:
+            return self._save_image(name, image_file.read())
+
+    def add_image(self, name, data):
+        self.images[name] = self.executor.submit(self._save_image, name, data)
+
+    def add_record(self, record):
+        if record['type'] == 'tag':
+            name = (record.get('name') or '').strip()
+            if not name:
+                raise ValueError("Tag sem nome")
+            self.pending_tags[name] = record.get('color')
+            return
+
+        if not record.get('title') or not record.get('description'):
+            raise ValueError("Projeto sem título ou descrição")
+        tags = record.get('tags') or []
+        if not isinstance(tags, list) or not all(isinstance(name, str) and name.strip()
+                                                 for name in tags):
+            raise ValueError(f"Projeto '{record['title']}': 'tags' deve ser uma lista de nomes")
+        record['tags'] = [name.strip() for name in tags]
+        for name in record['tags']:
+            if name not in self.tag_ids:
+                self.pending_tags.setdefault(name, None)
+
+        image = record.get('image')
+        if image and image not in self.images and image not in self.saved_images and self.images_dir:
+            self.images[image] = self.executor.submit(self._load_image, image)
+
+        self.pending_projects.append(record)
+        if len(self.pending_projects) >= self.batch_size:
+            self.flush()
+
+    def _flush_tags(self):
+        if not self.pending_tags:
+            return
+        names = list(self.pending_tags)
+        existing = {tag.name: tag for tag in Tag.query.filter(Tag.name.in_(names))}
+
+        new_rows = [{'name': name, 'color': color or DEFAULT_TAG_COLOR}
+                    for name, color in self.pending_tags.items() if name not in existing]
+        if new_rows:
+            result = db.session.execute(insert(Tag).returning(Tag.id, Tag.name), new_rows)
+            self.tag_ids.update({name: tag_id for tag_id, name in result})
+            self.tags_created += len(new_rows)
+
+        changed = [{'id': tag.id, 'color': self.pending_tags[name]}
+                   for name, tag in existing.items()
+                   if self.pending_tags[name] and self.pending_tags[name] != tag.color]
+        if changed:
+            db.session.execute(update(Tag), changed)
+            self.tags_updated += len(changed)
+
+        self.tag_ids.update({name: tag.id for name, tag in existing.items()})
+        self.pending_tags = {}
+
+    def flush(self):
+        self._flush_tags()
+        records, self.pending_projects = self.pending_projects, []
+        if not records:
+            db.session.commit()
+            return
+
+        now = datetime.utcnow()
+        rows = []
+        for record in records:
+            image = record.get('image')
+            future = self.images.pop(image, None)
+            if future is not None:
+                # Later projects with the same image reuse the saved file
+                self.saved_images[image] = future.result()
+                if self.saved_images[image]:
+                    self.images_saved += 1
+            row = {field: record.get(field) for field in PROJECT_FIELDS}
+            row['is_published'] = bool(row['is_published'])
+            row['is_featured'] = bool(row['is_featured'])
+            row['image_filename'] = self.saved_images.get(image)
+            row['created_at'] = _parse_datetime(record.get('created_at')) or now
+            row['updated_at'] = _parse_datetime(record.get('updated_at')) or now
+            row['user_id'] = self.user_id
+            rows.append(row)
+
+        result = db.session.execute(
+            insert(Project).returning(Project.id, sort_by_parameter_order=True), rows)
+        project_ids = result.scalars().all()
+
+        links = [{'project_id': project_id, 'tag_id': self.tag_ids[name]}
+                 for project_id, record in zip(project_ids, records)
+                 for name in dict.fromkeys(record['tags'])]
+        if links:
+            db.session.execute(insert(project_tags), links)
+        db.session.execute(insert(ProjectStats),
+                           [{'project_id': project_id, 'like_count': 0, 'comment_count': 0,
+                             'engagement': 0}
+                            for project_id in project_ids])
+        record_projects_imported(len(rows), sum(1 for row in rows if row['is_published']))
+
+        db.session.commit()
+        self.projects_created += len(rows)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            # Images nobody referenced still have to finish before returning
+            for future in self.images.values():
+                future.result()
+            self.images = {}
+            self.executor.shutdown()
+        return {
+            'tags_created': self.tags_created,
+            'tags_updated': self.tags_updated,
+            'projects_created': self.projects_created,
+            'images_saved': self.images_saved,
+        }
+
+class ImportAborted(Exception):
+    """An import stopped partway; batches before the error stay committed"""
+
+    def __init__(self, message, projects_created):
+        super().__init__(message)
+        self.projects_created = projects_created
+
+def import_jsonl(stream, importer, source='jsonl'):
+    for record in _read_records(stream, source):
+        importer.add_record(record)
+
+def import_tar(stream, importer):
+    with tarfile.open(fileobj=stream, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            data = archive.extractfile(member).read()
+            if member.name.startswith('images/'):
+                importer.add_image(os.path.basename(member.name), data)
+            elif member.name.endswith('.jsonl'):
+                import_jsonl(data.splitlines(), importer, member.name)
+
+def import_content(stream, filename, user_id, batch_size=DEFAULT_BATCH_SIZE, workers=4,
+                   images_dir=None):
+    """Import a .jsonl or tar export, returning counts of what was created.
+
+    Each batch commits on its own, so a bad record or a database error raises
+    ImportAborted carrying how many projects were already imported.
+    """
+    importer = Importer(user_id, batch_size=batch_size, workers=workers, images_dir=images_dir)
+    try:
+        if filename.endswith('.jsonl'):
+            import_jsonl(stream, importer, filename)
+        else:
+            try:
+                import_tar(stream, importer)
+            except tarfile.TarError:
+                raise ValueError("Arquivo não é um .jsonl nem um .tar válido")
+        return importer.close()
+    except (ValueError, SQLAlchemyError) as e:
+        db.session.rollback()
+        importer.executor.shutdown(cancel_futures=True)
+        message = str(getattr(e, 'orig', None) or e).strip()
+        raise ImportAborted(message, importer.projects_created) from e
+    except Exception:
+        db.session.rollback()
+        importer.executor.shutdown(cancel_futures=True)
+        raise
+
+@click.command('export-content')
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def export_command(output, batch_size):
+    """Export tags and projects to OUTPUT (.jsonl, or .tar.gz with images)"""
+    chunks = export_jsonl(batch_size) if output.endswith('.jsonl') else export_tar(batch_size)
+    with open(output, 'wb') as output_file:
+        for chunk in chunks:
+            output_file.write(chunk)
+    click.echo(f"Exported to {output}")
+
+@click.command('import-content')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.option('--images-dir', type=click.Path(exists=True, file_okay=False),
+              help='Folder with the images referenced by a .jsonl file.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option('--workers', default=4, show_default=True, help='Image processing threads.')
+@with_appcontext
+def import_command(source, images_dir, batch_size, workers):
+    """Import tags and projects from SOURCE (.jsonl or .tar.gz export)"""
+    owner = User.query.filter_by(is_owner=True).first()
+    mode = 'r' if source.endswith('.jsonl') else 'rb'
+    with open(source, mode, encoding='utf-8' if mode == 'r' else None) as source_file:
+        try:
+            result = import_content(source_file, source, owner.id, batch_size=batch_size,
+                                    workers=workers, images_dir=images_dir)
+        except ImportAborted as e:
+            if e.projects_created:
+                mark_stale('*')
+                db.session.commit()
+            raise click.ClickException(f"{e} ({e.projects_created} projects were imported "
+                                       f"before the error)")
+    mark_stale('*')
+    db.session.commit()
+    click.echo(f"Imported {result['projects_created']} projects, "
+               f"{result['tags_created']} new tags ({result['tags_updated']} updated), "
+               f"{result['images_saved']} images")